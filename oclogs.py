@@ -6,12 +6,14 @@ import click
 import arrow
 import time
 
-from threading import Thread
+from collections import defaultdict
+from threading import Lock, Thread
 
 from util import kube_api as kube
-from util.kube_api import crayons, DATE_FORMAT, Observer
+from util.kube_api import crayons, colorit, DATE_FORMAT, Observer
 from util.node_consumption import RunningPods
 from util.cloudwatch import setup_cw_logging
+from util.throttle import EventGroup, TokenBucket
 
 logging.basicConfig(format="%(message)s", level=logging.INFO)
 logger = logging.root
@@ -19,19 +21,101 @@ setup_cw_logging(logger)
 
 
 class Console(Observer):
+    """
+    window: seconds to aggregate events by (namespace, reason, kind) before
+            emitting a single summary line; 0 disables aggregation
+    rate: max lines per second per namespace; 0 disables rate limiting
+    burst: how many lines a namespace may emit at once, defaults to rate
+    """
+
+    report_interval = 10  # seconds between dropped-line reports without aggregation
+
+    def __init__(self, window=0, rate=0, burst=None):
+        super().__init__()
+        self.window = window
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.dropped = defaultdict(int)
+        self.groups = {}
+        self.lock = Lock()
+
+    @property
+    def throttled(self):
+        return bool(self.window or self.rate)
 
     def observe(self, resource, feed):
-        self.clear_seen_messages()
         msg = repr(resource)
         now = arrow.now()
 
-        if self.has_been_seen(msg, now):
-            return
+        with self.lock:
+            self.clear_seen_messages()
+            if self.has_been_seen(msg, now):
+                return
 
-        self.seen_messages[msg] = now
+            self.seen_messages[msg] = now
 
-        if resource.last_seen is None or resource.last_seen > self.since:
-            logger.info(msg)
+            if resource.last_seen is not None and resource.last_seen <= self.since:
+                return
+
+            if self.window and type(resource) == kube.Event:
+                self.aggregate(resource, msg)
+            else:
+                self.emit(resource.namespace, msg)
+
+    def aggregate(self, event, msg):
+        key = (event.namespace, event.reason, event.kind)
+        if key in self.groups:
+            self.groups[key].add(event)
+        else:
+            self.groups[key] = EventGroup(event, msg)
+
+    def emit(self, namespace, msg):
+        if self.rate:
+            if namespace not in self.buckets:
+                self.buckets[namespace] = TokenBucket(self.rate, self.burst)
+            if not self.buckets[namespace].consume():
+                self.dropped[namespace] += 1
+                return
+        logger.info(msg)
+
+    def summarize(self, group):
+        if group.count == 1:
+            return group.first_msg
+        names = list(group.names)
+        if group.count > len(names):
+            names.append("...")
+        names = ", ".join(names)
+        return "%s %s: [%s] x%d on %s - %s" % (
+            group.last_seen.format(DATE_FORMAT),
+            colorit(group.namespace),
+            group.reason,
+            group.count,
+            crayons.white(group.kind or "???"),
+            names
+        )
+
+    def flush(self):
+        # Summaries are already capped at one per group per window, so they
+        # bypass the rate limit; they're the only record of aggregated events.
+        with self.lock:
+            lines = [self.summarize(group) for group in self.groups.values()]
+            self.groups = {}
+            dropped, self.dropped = self.dropped, defaultdict(int)
+
+        for line in lines:
+            logger.info(line)
+
+        for namespace, count in dropped.items():
+            logger.info(f"{namespace or 'cluster'}: rate limited, suppressed {count} lines")
+
+    def flush_loop(self):
+        while True:
+            time.sleep(self.window or self.report_interval)
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Failed to flush console output")
 
 
 class SystemOOM(Observer):
@@ -98,12 +182,22 @@ class PodOOM(Observer):
 @click.option("-n", "--namespace")
 @click.option("--color/--no-color", default=True)
 @click.option("--ca-store")
-def main(token, api, namespace, color, ca_store):
+@click.option("--aggregate-window", type=click.IntRange(min=0), default=0,
+              help="Seconds to group events by namespace/reason/kind, 0 to disable")
+@click.option("--rate-limit", type=click.FloatRange(min=0), default=0,
+              help="Max console lines per second per namespace, 0 to disable")
+@click.option("--burst", type=click.IntRange(min=1),
+              help="Max console lines per namespace in a burst, defaults to --rate-limit")
+def main(token, api, namespace, color, ca_store, aggregate_window, rate_limit, burst):
 
     if not api:
         logger.info("Please specify valid api hostname using --api")
         return
 
+    if burst is not None and not rate_limit:
+        logger.info("--burst has no effect without --rate-limit")
+        return
+
     crayons.enabled = color
 
     API = f"https://{api}/%sapi/v1"
@@ -116,11 +210,15 @@ def main(token, api, namespace, color, ca_store):
         "Accept": "application/json"
     }
 
-    observers = (Console(), PodOOM(), SystemOOM(), FailedPodKill(), RunningPods())
+    console = Console(aggregate_window, rate_limit, burst)
+    observers = (console, PodOOM(), SystemOOM(), FailedPodKill(), RunningPods())
 
     if ca_store is not None and ca_store.lower() == "false":
         ca_store = False
 
+    if console.throttled:
+        Thread(target=console.flush_loop).start()
+
     feed = kube.NodeFeed(API % "", headers, namespace, observers, ca_store)
     Thread(target=feed.fetch_loop).start()
     time.sleep(2)  # Make sure nodes are populated before everything else
@@ -0,0 +1,53 @@
+import time
+
+
+class TokenBucket(object):
+    """
+    Classic token bucket: allows `rate` messages per second on average with
+    bursts of up to `burst` messages. Not thread-safe on its own; callers
+    are expected to hold their own lock around consume().
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst or rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def consume(self, tokens=1):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+
+class EventGroup(object):
+    """
+    Collects events sharing (namespace, reason, kind) within a single
+    aggregation window.
+    """
+
+    max_samples = 3
+
+    def __init__(self, event, msg):
+        self.first_msg = msg
+        self.namespace = event.namespace
+        self.reason = event.reason
+        self.kind = event.kind
+        self.last_seen = event.last_seen
+        self.count = 0
+        self.names = []
+        self.add(event)
+
+    def add(self, event):
+        self.count += 1
+        if event.last_seen is not None and event.last_seen > self.last_seen:
+            self.last_seen = event.last_seen
+        if event.name is None:
+            return
+        if event.name not in self.names and len(self.names) < self.max_samples:
+            self.names.append(event.name)